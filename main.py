@@ -4,15 +4,24 @@
 """
 
 import flet as ft
+import asyncio
+import base64
+import bisect
 import csv
+import gzip
+import hashlib
 import io
-import math
-import time
-import threading
+import json
 import logging
+import os
+import secrets
+import sys
+from array import array
 from enum import Enum
+from functools import lru_cache
+from itertools import accumulate, islice
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import IO, Callable, List, Optional, Tuple
 
 # -----------------------------------------------------------------------------
 # 日誌設定
@@ -29,6 +38,18 @@ COLOR_TEXT_MAIN = "#5C5C5C"
 COLOR_TEXT_SUB = "#8C8680"
 ITEMS_PER_PAGE = 20
 DEBOUNCE_DELAY = 0.3  # 搜尋延遲秒數
+SEARCH_CACHE_SIZE = 128  # 搜尋結果 LRU 快取筆數
+MIN_SEARCH_LENGTH = 2  # 少於此字數不搜尋（單字元幾乎符合全部資料）
+# 匯入時略過的代碼開頭（列出 ZZ 的大小寫組合，免逐列 upper()）
+EXCLUDED_CODE_PREFIXES = ("ZZ", "zz", "Zz", "zZ", "待")
+# FilePicker 上傳檔案的暫存目錄（以程式所在目錄為基準，與 ft.app 的解析方式一致）
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "temp")
+# Pyodide 靜態版沒有上傳端點（get_upload_url 一律失敗），僅提供貼上匯入
+FILE_UPLOAD_SUPPORTED = sys.platform != "emscripten"
+CSV_READ_BUFFER = 1 << 20  # 讀取上傳 CSV 的緩衝大小（1 MB）
+MAX_IMPORT_ROWS = 200_000  # 單次匯入筆數上限，避免誤貼超大內容耗盡記憶體
+INDEX_STORAGE_KEY = "product_index_v2"  # 索引格式變更時需更換 key
+STORAGE_FLUSH_DELAY = 2.0  # 資料變更後延遲寫入 Storage 的秒數（合併連續變更）
 
 
 # -----------------------------------------------------------------------------
@@ -49,9 +70,9 @@ class SortOrder(Enum):
 # -----------------------------------------------------------------------------
 # 資料類別
 # -----------------------------------------------------------------------------
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ProductItem:
-    """產品資料結構"""
+    """產品資料結構（slots：無 __dict__，屬性存取為固定位移）"""
     id: int
     code: str
     categoryName: str
@@ -81,14 +102,45 @@ class ProductItem:
         )
 
 
+# -----------------------------------------------------------------------------
+# Storage 編碼
+# -----------------------------------------------------------------------------
+def to_compact_json(data) -> str:
+    """序列化為緊湊 JSON：無多餘空白，中文不轉義為 \\uXXXX"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_storage_payload(data) -> str:
+    """壓縮為 gzip 後以 base64 字串存放"""
+    raw = to_compact_json(data).encode("utf-8")
+    return base64.b64encode(gzip.compress(raw)).decode("ascii")
+
+
+def decode_storage_payload(payload: str):
+    """還原 encode_storage_payload 的結果"""
+    return json.loads(gzip.decompress(base64.b64decode(payload)).decode("utf-8"))
+
+
+# -----------------------------------------------------------------------------
+# 搜尋輔助函式
+# -----------------------------------------------------------------------------
+# 前綴查詢上界：任何以 prefix 開頭的詞條皆小於 prefix + 最大碼位
+_PREFIX_UPPER = "\U0010ffff"
+
+
+def make_search_blob(code: str, name: str, spec: str) -> str:
+    """組合可搜尋欄位並轉小寫（以 Tab 分隔，避免跨欄位誤判）"""
+    return f"{code}\t{name}\t{spec}".lower()
+
+
 # -----------------------------------------------------------------------------
 # 預設範例資料
 # -----------------------------------------------------------------------------
 DEFAULT_DATA = [
-    {"id": 1, "code": "0137NE", "categoryName": "Syringes", "name": "Perouse Perouse Syringes 150ml", "spec": "", "udi": ""},
-    {"id": 2, "code": "0163NA", "categoryName": "High Pressure Tubing", "name": "Perouse HighPressure Line 50cm", "spec": "1.8mm", "udi": ""},
-    {"id": 3, "code": "0163ND", "categoryName": "High Pressure Tubing", "name": "Perouse HighPressure Line120cm", "spec": "", "udi": ""},
-    {"id": 4, "code": "0185NA", "categoryName": "Inflation Device", "name": "Perouse Inflation Device 30atm", "spec": "", "udi": ""},
+    ProductItem(1, "0137NE", "Syringes", "Perouse Perouse Syringes 150ml", "", ""),
+    ProductItem(2, "0163NA", "High Pressure Tubing", "Perouse HighPressure Line 50cm", "1.8mm", ""),
+    ProductItem(3, "0163ND", "High Pressure Tubing", "Perouse HighPressure Line120cm", "", ""),
+    ProductItem(4, "0185NA", "Inflation Device", "Perouse Inflation Device 30atm", "", ""),
 ]
 
 
@@ -103,7 +155,10 @@ class ProductApp:
         self._setup_page()
         self._init_state()
         self._load_data()
-        self._build_search_index()
+        # 串接字串與資料雜湊只計算一次，讀取已存索引與重建索引共用
+        self._init_index()
+        if not self._load_search_index():
+            self._build_search_index()
         self._init_ui()
 
     # =========================================================================
@@ -122,36 +177,143 @@ class ProductApp:
 
     def _init_state(self):
         """初始化狀態變數"""
-        self.all_data: List[dict] = []
-        self.filtered_data: List[dict] = []
-        self.search_index: dict = {}  # 搜尋索引
+        # 欄式儲存（SoA）：同一索引 i 在各欄位對應同一筆產品
+        self.codes: List[str] = []
+        self.categories: List[str] = []
+        self.names: List[str] = []
+        self.specs: List[str] = []
+        self.udis: List[str] = []
+        self.search_blobs: List[str] = []  # 預先轉小寫的可搜尋字串
+        self.filtered_indices: List[int] = []  # 搜尋結果（列索引）
+        # 搜尋索引：排序後的詞條與對應列索引（平行陣列），以 bisect 做前綴查詢
+        self._sorted_keys: List[str] = []
+        self._sorted_posts: List[int] = []
+        self._index_ready: bool = False  # 排序索引是否已建立完成
+        self._index_generation: int = 0  # 每次重建索引遞增，供背景建立判斷是否過期
+        self._data_hash: str = ""  # 目前資料的雜湊，用於判斷已存索引是否可用
+        self._corpus: str = ""  # 所有 search_blobs 以換行串接
+        self._line_starts: array = array("I")  # 每列在 _corpus 中的起始位置
+        self._last_term: str = ""  # 上次保底掃描的關鍵字
+        self._last_indices: List[int] = []  # 上次保底掃描的結果
+        # 搜尋結果記憶（LRU）：退格重打或相同字詞免重算；資料或索引變更時清除
+        self._filter_indices = lru_cache(maxsize=SEARCH_CACHE_SIZE)(self._search_with_index)
         self.current_page: int = 1
+        self.total_pages: int = 0  # 於 _perform_search 計算，翻頁時直接使用
+        self._last_pagination_key: Tuple[int, int] = (0, 0)  # 上次渲染的 (頁碼, 總頁數)
         self.search_term: str = ""
-        self.debounce_timer: Optional[threading.Timer] = None
+        self._search_version: int = 0  # 每次輸入遞增，供 debounce 判斷是否過期
+        # 資料已變更但尚未寫入 Storage 的欄位快照（code, categoryName, name, spec, udi）
+        self._unsaved_columns: Optional[Tuple[List[str], ...]] = None
+        # 尚未寫入 Storage 的索引（資料雜湊, 詞條, 列索引），與資料於同一次延遲寫入
+        self._unsaved_index: Optional[Tuple[str, List[str], List[int]]] = None
+        self._flush_version: int = 0  # 每次標記變更遞增，供延遲寫入判斷是否過期
         self.current_tab: TabName = TabName.SEARCH
 
     def _load_data(self):
         """從 Client Storage 讀取資料"""
         try:
             stored_data = self.page.client_storage.get("product_data")
-            if stored_data:
-                self.all_data = stored_data
-                logger.info(f"已從 Storage 載入 {len(self.all_data)} 筆資料")
+            if isinstance(stored_data, str):
+                stored_data = decode_storage_payload(stored_data)
+
+            if isinstance(stored_data, dict) and stored_data.get("code"):
+                columns = [stored_data[key] for key in
+                           ("code", "categoryName", "name", "spec", "udi")]
+                if len(set(map(len, columns))) != 1:
+                    raise ValueError("儲存的欄位長度不一致")
+                self._set_columns(*columns)
+                logger.info(f"已從 Storage 載入 {len(self.codes)} 筆資料")
+            elif isinstance(stored_data, list) and stored_data:
+                # 舊版格式：list of dict
+                self._set_rows([ProductItem.from_dict(row) for row in stored_data])
+                logger.info(f"已從 Storage 載入 {len(self.codes)} 筆資料（舊版格式）")
             else:
-                self.all_data = DEFAULT_DATA.copy()
+                self._set_rows(DEFAULT_DATA)
                 logger.info("使用預設資料")
         except Exception as e:
             logger.warning(f"讀取 Storage 失敗: {e}")
-            self.all_data = DEFAULT_DATA.copy()
+            self._set_rows(DEFAULT_DATA)
 
         # 初始不顯示搜尋結果（效能優化）
-        self.filtered_data = []
+        self.filtered_indices = []
+
+    def _set_columns(self, codes: List[str], categories: List[str], names: List[str],
+                     specs: List[str], udis: List[str]):
+        """設定欄式資料並預先計算 search_blobs"""
+        # 類別種類少而列數多，去重後每列僅存參照，亦可用 is 比對
+        category_interner: dict = {}
+        self.codes = codes
+        self.categories = [category_interner.setdefault(c, c) for c in categories]
+        self.names = names
+        self.specs = specs
+        self.udis = udis
+        self.search_blobs = list(map(make_search_blob, codes, names, specs))
+
+    def _set_rows(self, rows: List[ProductItem]):
+        """由逐筆的 ProductItem 轉為欄式資料"""
+        self._set_columns(
+            [str(row.code) for row in rows],
+            [str(row.categoryName) for row in rows],
+            [str(row.name) for row in rows],
+            [str(row.spec) for row in rows],
+            [str(row.udi) for row in rows],
+        )
 
-    def _save_data(self):
+    def _mark_dirty(self):
+        """標記資料已變更，於 STORAGE_FLUSH_DELAY 秒內無新變更時才寫入"""
+        # 於替換資料的同一流程取得欄位快照：_set_columns 整批替換 list 而不修改內容，
+        # 保留參照即可確保寫入的各欄等長，不受之後的匯入影響
+        self._unsaved_columns = (self.codes, self.categories, self.names,
+                                 self.specs, self.udis)
+        self._schedule_flush()
+
+    def _mark_index_dirty(self):
+        """標記索引已建立完成，與資料變更合併於同一次延遲寫入"""
+        # 以資料雜湊為鍵：讀取時雜湊不符即不採用
+        self._unsaved_index = (self._data_hash, self._sorted_keys, self._sorted_posts)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """排程延遲寫入（較新的排程會使先前的排程失效）"""
+        self._flush_version += 1
+        self.page.run_task(self._flush_storage_later, self._flush_version)
+
+    async def _flush_storage_later(self, version: int):
+        """延遲寫入（期間若再有變更則交由較新的排程處理）"""
+        await asyncio.sleep(STORAGE_FLUSH_DELAY)
+        if version != self._flush_version:
+            return
+        # 取出快照後清除標記：寫入期間若再有變更，會由較新的排程再寫一次
+        columns, self._unsaved_columns = self._unsaved_columns, None
+        index, self._unsaved_index = self._unsaved_index, None
+        if columns is None and index is None:
+            return
+        # client_storage.set 為同步呼叫，於事件迴圈中會阻塞到逾時，改由背景執行緒寫入
+        self.page.run_thread(self._flush_storage, columns, index)
+
+    def _flush_storage(self, columns: Optional[Tuple[List[str], ...]],
+                       index: Optional[Tuple[str, List[str], List[int]]]):
+        """背景執行緒：將欄位快照與索引存入 Client Storage"""
+        if columns is not None:
+            self._save_data(columns)
+        if index is not None:
+            self._save_search_index(*index)
+        self.page.update()
+
+    def _save_data(self, columns: Tuple[List[str], ...]):
         """存入 Client Storage"""
+        codes, categories, names, specs, udis = columns
         try:
-            self.page.client_storage.set("product_data", self.all_data)
-            logger.info(f"成功儲存 {len(self.all_data)} 筆資料")
+            # 以欄式格式、gzip 壓縮儲存；search_blobs 可由欄位重建，不寫入 Storage
+            stored_data = {
+                "code": codes,
+                "categoryName": categories,
+                "name": names,
+                "spec": specs,
+                "udi": udis,
+            }
+            self.page.client_storage.set("product_data", encode_storage_payload(stored_data))
+            logger.info(f"成功儲存 {len(codes)} 筆資料")
         except PermissionError:
             logger.error("Storage 權限不足")
             self._show_snack("儲存失敗：權限不足", False)
@@ -163,60 +325,157 @@ class ProductApp:
     # 效能優化：搜尋索引
     # =========================================================================
     def _build_search_index(self):
-        """建立搜尋索引以加速查詢"""
-        self.search_index = {}
-        for item in self.all_data:
-            # 合併所有可搜尋欄位
-            searchable_text = f"{item['code']} {item['name']} {item['spec']}".lower()
-
-            # 以空白分割建立索引
-            for word in searchable_text.split():
-                if word not in self.search_index:
-                    self.search_index[word] = []
-                if item not in self.search_index[word]:
-                    self.search_index[word].append(item)
-
-            # 同時支援前綴匹配（更彈性的搜尋）
-            self._add_prefix_index(item, searchable_text)
-
-        logger.info(f"搜尋索引建立完成，共 {len(self.search_index)} 個詞條")
-
-    def _add_prefix_index(self, item: dict, text: str):
-        """為前綴搜尋建立索引"""
-        # 針對 code, name, spec 的開頭建立前綴索引
-        for key in ['code', 'name', 'spec']:
-            value = str(item.get(key, '')).lower()
-            for i in range(1, min(len(value) + 1, 10)):  # 最多取前 10 字元
-                prefix = value[:i]
-                prefix_key = f"_prefix_{prefix}"
-                if prefix_key not in self.search_index:
-                    self.search_index[prefix_key] = []
-                if item not in self.search_index[prefix_key]:
-                    self.search_index[prefix_key].append(item)
-
-    def _search_with_index(self, term: str) -> List[dict]:
-        """使用索引進行搜尋"""
+        """建立搜尋索引以加速查詢（需先以 _init_index 準備好目前資料）"""
+        result = self._sort_index_entries(self.search_blobs, self._index_generation)
+        if result is None:
+            return  # 期間已有較新的重建
+        self._sorted_keys, self._sorted_posts = result
+        self._index_ready = True
+        self._filter_indices.cache_clear()  # 索引完成後結果可能不同
+        self._mark_index_dirty()
+
+        logger.info(f"搜尋索引建立完成，共 {len(self._sorted_keys)} 個詞條")
+
+    def _load_search_index(self) -> bool:
+        """從 Client Storage 讀取已建立的索引（資料雜湊相符才使用）"""
+        try:
+            stored_index = self.page.client_storage.get(INDEX_STORAGE_KEY)
+        except Exception as e:
+            logger.warning(f"讀取索引失敗: {e}")
+            return False
+
+        if isinstance(stored_index, str):
+            try:
+                # 舊版格式為未壓縮的 JSON 字串
+                if stored_index.startswith("{"):
+                    stored_index = json.loads(stored_index)
+                else:
+                    stored_index = decode_storage_payload(stored_index)
+            except Exception as e:
+                logger.warning(f"解析索引失敗: {e}")
+                return False
+        if not isinstance(stored_index, dict) or stored_index.get("hash") != self._data_hash:
+            return False
+
+        self._sorted_keys = stored_index["keys"]
+        self._sorted_posts = stored_index["posts"]
+        self._index_ready = True
+        self._filter_indices.cache_clear()
+        logger.info(f"已從 Storage 載入搜尋索引，共 {len(self._sorted_keys)} 個詞條")
+        return True
+
+    def _save_search_index(self, data_hash: str, keys: List[str], posts: List[int]):
+        """將索引與資料雜湊存入 Client Storage，下次啟動可略過重建"""
+        try:
+            # 與產品資料相同以 gzip + base64 儲存，索引體積遠大於原始資料
+            self.page.client_storage.set(INDEX_STORAGE_KEY, encode_storage_payload({
+                "hash": data_hash,
+                "keys": keys,
+                "posts": posts,
+            }))
+        except Exception as e:
+            # 索引僅為快取，寫入失敗不影響使用
+            logger.warning(f"儲存索引失敗: {e}")
+
+    def _init_index(self):
+        """清空排序索引，並重建保底搜尋用的串接字串"""
+        self._sorted_keys = []
+        self._sorted_posts = []
+        self._index_ready = False
+        self._index_generation += 1
+        self._unsaved_index = None  # 舊資料的索引已無需寫入
+
+        # 串接成單一字串，保底搜尋交由 C 層的 str.find 掃描
+        # 起始位置以連續的 uint32 陣列保存，bisect 可直接作用其上
+        self._line_starts = array(
+            "I", accumulate((len(blob) + 1 for blob in self.search_blobs), initial=0)
+        )
+        self._line_starts.pop()  # 最後一項為總長度，非任何列的起點
+        self._corpus = "\n".join(self.search_blobs)
+        self._data_hash = hashlib.sha1(self._corpus.encode("utf-8")).hexdigest()
+        self._last_term = ""
+        self._last_indices = []
+        self._filter_indices.cache_clear()
+
+    @staticmethod
+    def _index_keys(blob: str) -> set:
+        """取出單筆資料的詞條"""
+        # code、name、spec 的完整值與其中每個詞都作為詞條；
+        # 直接切分已轉小寫的 search_blob，不再逐欄 lower()，重複詞條由 set 去除
+        keys = set(blob.split("\t"))
+        keys.update(blob.split())
+        keys.discard("")
+        return keys
+
+    def _sort_index_entries(self, blobs: List[str], generation: int
+                            ) -> Optional[Tuple[List[str], List[int]]]:
+        """由 blobs 建立排序詞條與對應列索引（期間若資料再度變更則回傳 None）"""
+        # 只寫入區域變數，不觸碰共享的索引狀態，背景執行緒亦可安全呼叫
+        entries = []
+        for idx, blob in enumerate(blobs):
+            if generation != self._index_generation:
+                return None
+            entries.extend((key, idx) for key in self._index_keys(blob))
+
+        entries.sort()
+        return [key for key, _ in entries], [idx for _, idx in entries]
+
+    def _build_index_in_background(self, generation: int, blobs: List[str]):
+        """於背景執行緒逐筆建立索引（期間若資料再度變更則放棄）"""
+        # 只讀取呼叫端交付的 blobs 快照，事件迴圈期間即使替換資料或重建索引，
+        # 此處也不會讀到不一致的內容
+        result = self._sort_index_entries(blobs, generation)
+        if result is None or generation != self._index_generation:
+            return
+        keys, posts = result
+        self.page.run_task(self._publish_index, generation, keys, posts)
+
+    async def _publish_index(self, generation: int, keys: List[str], posts: List[int]):
+        """於事件迴圈套用背景建立的索引（資料已再度變更則捨棄）"""
+        if generation != self._index_generation:
+            return
+        self._sorted_keys, self._sorted_posts = keys, posts
+        self._index_ready = True
+        self._filter_indices.cache_clear()  # 索引完成後結果可能不同
+        self._mark_index_dirty()
+        logger.info(f"搜尋索引建立完成，共 {len(keys)} 個詞條")
+        self._show_snack("搜尋索引建立完成", True)
+        self.page.update()
+
+    def _search_with_index(self, term: str) -> List[int]:
+        """使用索引進行搜尋，回傳符合的列索引"""
         term_lower = term.lower().strip()
 
         if not term_lower:
             return []
 
-        # 先嘗試前綴匹配
-        prefix_key = f"_prefix_{term_lower}"
-        if prefix_key in self.search_index:
-            return self.search_index[prefix_key]
-
-        # 再嘗試完整詞匹配
-        if term_lower in self.search_index:
-            return self.search_index[term_lower]
-
-        # 最後用傳統方式搜尋（保底）
-        return [
-            row for row in self.all_data
-            if term_lower in str(row['code']).lower() or
-               term_lower in str(row['name']).lower() or
-               term_lower in str(row['spec']).lower()
-        ]
+        # 先以排序詞條做前綴匹配（依原始順序排列）；建立中則直接走子字串搜尋
+        if self._index_ready:
+            lo = bisect.bisect_left(self._sorted_keys, term_lower)
+            hi = bisect.bisect_left(self._sorted_keys, term_lower + _PREFIX_UPPER, lo)
+            if lo < hi:
+                return sorted(set(self._sorted_posts[lo:hi]))
+
+        # 前綴無命中具單調性：延伸後的關鍵字同樣無命中，
+        # 且其子字串結果必為上次結果的子集，只需在上次結果中過濾
+        if self._last_term and term_lower.startswith(self._last_term):
+            blobs = self.search_blobs
+            results = [i for i in self._last_indices if term_lower in blobs[i]]
+            self._last_term, self._last_indices = term_lower, results
+            return results
+
+        # 最後在串接字串上做子字串搜尋（保底），命中位置以二分搜尋換算回列
+        results = []
+        line_starts = self._line_starts
+        pos = self._corpus.find(term_lower)
+        while pos != -1:
+            idx = bisect.bisect_right(line_starts, pos) - 1
+            results.append(idx)
+            if idx + 1 >= len(line_starts):
+                break
+            pos = self._corpus.find(term_lower, line_starts[idx + 1])
+        self._last_term, self._last_indices = term_lower, results
+        return results
 
     # =========================================================================
     # UI 建構
@@ -230,15 +489,19 @@ class ProductApp:
 
     def _build_navbar(self):
         """建立導覽列"""
+        # 樣式只有兩種，建立一次後重複使用
+        self._nav_style_active = self._get_nav_style(True)
+        self._nav_style_inactive = self._get_nav_style(False)
+
         self.nav_search = ft.TextButton(
             "查詢",
-            on_click=lambda _: self._switch_tab(TabName.SEARCH),
-            style=self._get_nav_style(True)
+            on_click=lambda _: self._on_nav_click(TabName.SEARCH),
+            style=self._nav_style_active
         )
         self.nav_admin = ft.TextButton(
             "管理",
-            on_click=lambda _: self._switch_tab(TabName.ADMIN),
-            style=self._get_nav_style(False)
+            on_click=lambda _: self._on_nav_click(TabName.ADMIN),
+            style=self._nav_style_inactive
         )
 
         logo = ft.Container(
@@ -283,7 +546,9 @@ class ProductApp:
                                 on_click=self._clear_search, icon_color="#B0A8A0")
         )
 
-        # 資料表格
+        # 資料表格：預先建立固定 ITEMS_PER_PAGE 列，翻頁與搜尋時只更新文字內容
+        row_pool = [self._make_row() for _ in range(ITEMS_PER_PAGE)]
+        self._row_texts = [texts for _, texts in row_pool]
         self.data_table = ft.DataTable(
             columns=[
                 ft.DataColumn(ft.Text("產品代碼", size=13, color=COLOR_TEXT_SUB)),
@@ -293,19 +558,33 @@ class ProductApp:
                 ft.DataColumn(ft.Text("UDI", size=13, color=COLOR_TEXT_SUB)),
             ],
             width=1000,
+            rows=[row for row, _ in row_pool],
             heading_row_color="#F9F8F4",
             data_row_max_height=float("inf"),
         )
 
         # 分頁控制（獨立命名）
-        self.pagination_controls = ft.Row(alignment=ft.MainAxisAlignment.CENTER)
+        # 控制項只建立一次，換頁時僅更新 disabled 與頁碼文字
+        self.prev_page_button = ft.IconButton(
+            ft.Icons.CHEVRON_LEFT,
+            on_click=lambda _: self._change_page(-1)
+        )
+        self.page_info_text = ft.Text("", size=12, color=COLOR_TEXT_SUB)
+        self.next_page_button = ft.IconButton(
+            ft.Icons.CHEVRON_RIGHT,
+            on_click=lambda _: self._change_page(1)
+        )
+        self.pagination_controls = ft.Row(
+            [self.prev_page_button, self.page_info_text, self.next_page_button],
+            alignment=ft.MainAxisAlignment.CENTER
+        )
 
         # 狀態文字（獨立命名）
         self.status_text = ft.Text("請輸入搜尋條件", color=COLOR_TEXT_SUB, size=14)
 
         # 資料庫筆數文字（獨立命名）
         self.db_count_text = ft.Text(
-            f"目前資料庫：{len(self.all_data)} 筆紀錄",
+            f"目前資料庫：{len(self.codes)} 筆紀錄",
             color=COLOR_TEXT_SUB,
             italic=True
         )
@@ -355,10 +634,36 @@ class ProductApp:
             border_color="#CFC8C0"
         )
 
-        upload_area = ft.Container(
-            content=ft.Column([
+        # CSV 檔案上傳（逐行串流解析，不經過文字框）
+        self.file_picker = ft.FilePicker(
+            on_result=self._on_file_picked,
+            on_upload=self._on_file_uploaded
+        )
+
+        if FILE_UPLOAD_SUPPORTED:
+            import_header = [
+                ft.Icon(ft.Icons.UPLOAD_FILE_OUTLINED, size=50, color=COLOR_TEXT_SUB),
+                ft.Text("上傳 CSV 檔案", color=COLOR_TEXT_MAIN),
+                ft.ElevatedButton(
+                    "選擇檔案",
+                    icon=ft.Icons.FOLDER_OPEN_OUTLINED,
+                    bgcolor=COLOR_PRIMARY,
+                    color="white",
+                    on_click=lambda _: self.file_picker.pick_files(
+                        allowed_extensions=["csv"]
+                    )
+                ),
+                ft.Divider(color="#DCD6CE", height=30),
+                ft.Text("或直接貼上 CSV 內容", color=COLOR_TEXT_MAIN),
+            ]
+        else:
+            import_header = [
                 ft.Icon(ft.Icons.PASTE_OUTLINED, size=50, color=COLOR_TEXT_SUB),
                 ft.Text("直接貼上 CSV 內容", color=COLOR_TEXT_MAIN),
+            ]
+
+        upload_area = ft.Container(
+            content=ft.Column(import_header + [
                 self.csv_input,
                 ft.Container(height=10),
                 ft.ElevatedButton(
@@ -412,6 +717,8 @@ class ProductApp:
 
     def _assemble_page(self):
         """組合主畫面"""
+        if FILE_UPLOAD_SUPPORTED:
+            self.page.overlay.append(self.file_picker)
         self.page.add(
             self.navbar,
             ft.Container(
@@ -432,8 +739,13 @@ class ProductApp:
             side=ft.BorderSide(0, ft.Colors.TRANSPARENT)
         )
 
+    def _on_nav_click(self, tab: TabName):
+        """導覽按鈕點擊"""
+        self._switch_tab(tab)
+        self.page.update()
+
     def _switch_tab(self, tab: TabName):
-        """切換頁籤"""
+        """切換頁籤（僅變更狀態，由呼叫端負責 page.update）"""
         self.current_tab = tab
         is_search = tab == TabName.SEARCH
 
@@ -441,127 +753,149 @@ class ProductApp:
         self.admin_view.visible = not is_search
 
         # 更新導覽樣式
-        self.nav_search.style = self._get_nav_style(is_search)
-        self.nav_admin.style = self._get_nav_style(not is_search)
-
-        self.page.update()
+        if is_search:
+            self.nav_search.style = self._nav_style_active
+            self.nav_admin.style = self._nav_style_inactive
+        else:
+            self.nav_search.style = self._nav_style_inactive
+            self.nav_admin.style = self._nav_style_active
 
     # =========================================================================
     # 效能優化：Debounce 搜尋
     # =========================================================================
     def _on_search_change(self, e):
         """搜尋輸入變更（帶 Debounce）"""
-        # 取消前一個計時器
-        if self.debounce_timer:
-            self.debounce_timer.cancel()
-
         self.search_term = e.control.value
 
-        # 設定新的延遲計時器
-        self.debounce_timer = threading.Timer(
-            DEBOUNCE_DELAY,
-            self._debounced_search
-        )
-        self.debounce_timer.start()
+        # 以版本號取代計時器：在頁面事件迴圈上排程，不另建執行緒
+        self._search_version += 1
+        self.page.run_task(self._debounced_search, self._search_version)
 
-    def _debounced_search(self):
-        """延遲後執行的搜尋"""
+    async def _debounced_search(self, version: int):
+        """延遲後執行的搜尋（期間若有新輸入則放棄）"""
+        await asyncio.sleep(DEBOUNCE_DELAY)
+        if version != self._search_version:
+            return
         self._perform_search()
-        self.page.update()
+        self._update_search_results()
 
     def _clear_search(self, e):
         """清除搜尋"""
         self.search_field.value = ""
         self.search_term = ""
+        self._search_version += 1  # 作廢尚未執行的 debounce 搜尋
         self._perform_search()
-        self.page.update()
+        self._update_search_results(self.search_field)
+
+    def _update_search_results(self, *extra: ft.Control):
+        """只送出搜尋結果相關元件的差異，不走訪整個頁面（一次送出）"""
+        self.page.update(self.data_table, self.status_text, self.pagination_controls, *extra)
 
     def _perform_search(self):
         """執行搜尋"""
         term = self.search_term.lower().strip()
 
         if not term:
-            self.filtered_data = []
+            self.filtered_indices = []
             self.status_text.value = "請輸入搜尋條件"
             self.status_text.visible = True
             self.data_table.visible = False
             self.pagination_controls.visible = False
+        elif len(term) < MIN_SEARCH_LENGTH:
+            # 略過掃描與整頁渲染
+            self.filtered_indices = []
+            self.status_text.value = f"請輸入至少 {MIN_SEARCH_LENGTH} 個字元"
+            self.status_text.visible = True
+            self.data_table.visible = False
+            self.pagination_controls.visible = False
         else:
             # 使用索引加速搜尋
-            self.filtered_data = self._search_with_index(term)
+            self.filtered_indices = self._filter_indices(term)
             self.current_page = 1
-            self.status_text.visible = not self.filtered_data
-            self.status_text.value = "查無資料" if not self.filtered_data else ""
+            self.status_text.visible = not self.filtered_indices
+            self.status_text.value = "查無資料" if not self.filtered_indices else ""
             self.data_table.visible = True
             self.pagination_controls.visible = True
 
+        # 整數無條件進位，避免浮點除法與 math.ceil
+        self.total_pages = (len(self.filtered_indices) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
         self._render_table()
 
     # =========================================================================
     # 表格渲染
     # =========================================================================
     def _render_table(self):
-        """渲染表格內容"""
-        if not self.filtered_data:
-            self.data_table.rows = []
-            self._render_pagination()
-            return
-
+        """渲染表格內容（只更新固定列的文字，不重建控制項）"""
         start = (self.current_page - 1) * ITEMS_PER_PAGE
-        end = start + ITEMS_PER_PAGE
-        page_data = self.filtered_data[start:end]
-
-        self.data_table.rows = []
-        for item in page_data:
-            self.data_table.rows.append(
-                ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(item['code'], font_family="Monospace",
-                                       color=COLOR_TEXT_MAIN)),
-                    ft.DataCell(ft.Container(
-                        content=ft.Text(item['categoryName'], size=12, color=COLOR_PRIMARY),
-                        bgcolor="#F5F2EF", padding=5, border_radius=10
-                    )),
-                    ft.DataCell(ft.Text(item['name'], size=12, color=COLOR_TEXT_MAIN,
-                                       width=300, no_wrap=False)),
-                    ft.DataCell(ft.Text(item['spec'] or "-", size=12,
-                                       color=COLOR_TEXT_SUB, width=150, no_wrap=False)),
-                    ft.DataCell(ft.Text(item['udi'], size=12, color="#B0A8A0")),
-                ])
-            )
+        page_indices = self.filtered_indices[start:start + ITEMS_PER_PAGE]
+
+        for slot, (row, texts) in enumerate(zip(self.data_table.rows, self._row_texts)):
+            if slot >= len(page_indices):
+                row.visible = False
+                continue
+
+            i = page_indices[slot]
+            code_text, category_text, name_text, spec_text, udi_text = texts
+            code_text.value = self.codes[i]
+            category_text.value = self.categories[i]
+            name_text.value = self.names[i]
+            spec_text.value = self.specs[i] or "-"
+            udi_text.value = self.udis[i]
+            row.visible = True
 
         self._render_pagination()
 
+    def _make_row(self) -> Tuple[ft.DataRow, Tuple[ft.Text, ...]]:
+        """建立空白表格列，回傳列與其五個文字控制項"""
+        texts = (
+            ft.Text("", font_family="Monospace", color=COLOR_TEXT_MAIN),
+            ft.Text("", size=12, color=COLOR_PRIMARY),
+            ft.Text("", size=12, color=COLOR_TEXT_MAIN, width=300, no_wrap=False),
+            ft.Text("", size=12, color=COLOR_TEXT_SUB, width=150, no_wrap=False),
+            ft.Text("", size=12, color="#B0A8A0"),
+        )
+        code_text, category_text, name_text, spec_text, udi_text = texts
+        row = ft.DataRow(
+            cells=[
+                ft.DataCell(code_text),
+                ft.DataCell(ft.Container(
+                    content=category_text,
+                    bgcolor="#F5F2EF", padding=5, border_radius=10
+                )),
+                ft.DataCell(name_text),
+                ft.DataCell(spec_text),
+                ft.DataCell(udi_text),
+            ],
+            visible=False,
+        )
+        return row, texts
+
     def _render_pagination(self):
         """渲染分頁控制"""
-        total_pages = math.ceil(len(self.filtered_data) / ITEMS_PER_PAGE)
+        total_pages = self.total_pages
         if total_pages <= 1:
             self.pagination_controls.visible = False
             return
 
         self.pagination_controls.visible = True
-        self.pagination_controls.controls = [
-            ft.IconButton(
-                ft.Icons.CHEVRON_LEFT,
-                on_click=lambda _: self._change_page(-1),
-                disabled=self.current_page == 1
-            ),
-            ft.Text(f"第 {self.current_page} 頁 / 共 {total_pages} 頁",
-                   size=12, color=COLOR_TEXT_SUB),
-            ft.IconButton(
-                ft.Icons.CHEVRON_RIGHT,
-                on_click=lambda _: self._change_page(1),
-                disabled=self.current_page == total_pages
-            )
-        ]
+
+        # 頁碼與總頁數未變時不需變更任何屬性
+        pagination_key = (self.current_page, total_pages)
+        if pagination_key == self._last_pagination_key:
+            return
+        self._last_pagination_key = pagination_key
+
+        self.prev_page_button.disabled = self.current_page == 1
+        self.page_info_text.value = f"第 {self.current_page} 頁 / 共 {total_pages} 頁"
+        self.next_page_button.disabled = self.current_page == total_pages
 
     def _change_page(self, delta: int):
         """切換分頁"""
-        total_pages = math.ceil(len(self.filtered_data) / ITEMS_PER_PAGE)
         new_page = self.current_page + delta
-        if 1 <= new_page <= total_pages:
+        if 1 <= new_page <= self.total_pages:
             self.current_page = new_page
             self._render_table()
-            self.page.update()
+            self._update_search_results()
 
     # =========================================================================
     # CSV 匯入
@@ -571,70 +905,163 @@ class ProductApp:
         content = self.csv_input.value
         if not content:
             self._show_snack("請先貼上內容", False)
+            self.page.update()
             return
 
+        # 匯入、切換頁籤與提示訊息合併為一次 page.update
         self._process_csv_content(content)
         self.csv_input.value = ""
         self._switch_tab(TabName.SEARCH)
+        self.page.update()
 
-    def _process_csv_content(self, text_content: str):
-        """解析 CSV 字串"""
-        lines = text_content.splitlines()
-        parsed_data = []
+    def _on_file_picked(self, e: ft.FilePickerResultEvent):
+        """選取 CSV 檔案後：桌面版直接讀取路徑，網頁版先上傳"""
+        if not e.files:
+            return
+
+        picked = e.files[0]
+        if picked.path:
+            self._import_csv_file(picked.path)
+            return
 
         try:
-            reader = csv.reader(lines)
-            next(reader, None)  # 跳過標題
-
-            for idx, row in enumerate(reader, 1):
-                if len(row) < 5:
-                    continue
-
-                code = row[0].strip()
-                # 過濾邏輯
-                if code.upper().startswith("ZZ") or code.startswith("待"):
-                    continue
-
-                parsed_data.append({
-                    "id": idx,
-                    "code": code,
-                    "categoryName": row[2].strip(),
-                    "name": row[3].strip(),
-                    "spec": row[4].strip(),
-                    "udi": ""
-                })
-
-            if parsed_data:
-                self.all_data = parsed_data
-                self._save_data()
-                self._build_search_index()  # 重建索引
-                self._show_snack(f"成功匯入 {len(parsed_data)} 筆資料", True)
-                # 更新 UI（使用獨立命名的元件）
-                self.db_count_text.value = f"目前資料庫：{len(self.all_data)} 筆紀錄"
-            else:
-                self._show_snack("無有效資料", False)
+            # 每個工作階段上傳至各自的子目錄，避免同名檔案互相覆蓋或刪除
+            upload_url = self.page.get_upload_url(f"{self.page.session_id}/{picked.name}", 600)
+            self.file_picker.upload([ft.FilePickerUploadFile(picked.name, upload_url=upload_url)])
+        except Exception as ex:
+            logger.warning(f"檔案上傳失敗: {ex}")
+            self._show_snack("此環境不支援檔案上傳，請改用貼上匯入", False)
+            self.page.update()
+
+    def _on_file_uploaded(self, e: ft.FilePickerUploadEvent):
+        """上傳完成後自暫存目錄讀取並刪除暫存檔"""
+        if e.error:
+            self._show_snack(f"上傳失敗：{e.error}", False)
+            self.page.update()
+            return
+        if e.progress is None or e.progress < 1:
+            return
+
+        # file_name 來自用戶端事件，只取檔名，且實際路徑須位於本工作階段目錄內
+        session_dir = os.path.realpath(os.path.join(UPLOAD_DIR, self.page.session_id))
+        path = os.path.realpath(os.path.join(session_dir, os.path.basename(e.file_name)))
+        if os.path.dirname(path) != session_dir:
+            logger.warning(f"拒絕不合法的上傳檔名: {e.file_name!r}")
+            self._show_snack("上傳失敗：檔名不合法", False)
+            self.page.update()
+            return
+
+        self._import_csv_file(path, remove_after=True)
+
+    def _import_csv_file(self, path: str, remove_after: bool = False):
+        """以緩衝串流讀取 CSV 檔案並匯入（remove_after：匯入後刪除暫存檔）"""
+        def open_file():
+            return open(path, "r", encoding="utf-8-sig", newline="",
+                        buffering=CSV_READ_BUFFER)
 
+        def remove_file():
+            if os.path.exists(path):
+                os.remove(path)
+            try:
+                os.rmdir(os.path.dirname(path))  # 工作階段暫存目錄已空則一併移除
+            except OSError:
+                pass
+
+        self._start_import(open_file, remove_file if remove_after else None)
+        self._switch_tab(TabName.SEARCH)
+        self.page.update()
+
+    def _process_csv_content(self, text_content: str):
+        """解析 CSV 字串"""
+        # 直接以 StringIO 串流讀取，不先 splitlines() 複製出整份行清單
+        self._start_import(lambda: io.StringIO(text_content, newline=""))
+
+    def _start_import(self, open_stream: Callable[[], IO[str]],
+                      cleanup: Optional[Callable[[], None]] = None):
+        """將 CSV 解析交給背景執行緒，避免大量資料時畫面凍結"""
+        self._show_snack("資料匯入中…", True)
+        self.page.run_thread(self._import_worker, open_stream, cleanup)
+
+    def _import_worker(self, open_stream: Callable[[], IO[str]],
+                       cleanup: Optional[Callable[[], None]]):
+        """背景執行緒：解析 CSV，完成後排程回事件迴圈套用結果"""
+        try:
+            with open_stream() as stream:
+                rows = self._parse_csv_rows(stream)
         except Exception as e:
             logger.exception(f"CSV 解析錯誤: {e}")
             self._show_snack(f"解析錯誤: {str(e)}", False)
+            self.page.update()
+            return
+        finally:
+            if cleanup:
+                cleanup()
+
+        self.page.run_task(self._apply_import, rows)
+
+    @staticmethod
+    def _parse_csv_rows(stream: IO[str]) -> List[Tuple[str, str, str, str]]:
+        """逐行解析 CSV 串流，回傳 (代碼, 類別, 品名, 規格)"""
+        reader = csv.reader(stream)
+        next(reader, None)  # 跳過標題
+
+        # 以產生器完成欄位擷取與過濾（'ZZ' 或 '待' 開頭者略過），達上限即停止讀取
+        rows = (
+            (code, row[2].strip(), row[3].strip(), row[4].strip())
+            for row in reader
+            if len(row) >= 5
+            and not (code := row[0].strip()).startswith(EXCLUDED_CODE_PREFIXES)
+        )
+        # 多讀一筆供呼叫端判斷是否超過上限
+        return list(islice(rows, MAX_IMPORT_ROWS + 1))
+
+    async def _apply_import(self, rows: List[Tuple[str, str, str, str]]):
+        """於事件迴圈套用解析結果，索引再交由背景執行緒建立"""
+        if not rows:
+            self._show_snack("無有效資料", False)
+            self.page.update()
+            return
+
+        truncated = len(rows) > MAX_IMPORT_ROWS
+        if truncated:
+            del rows[MAX_IMPORT_ROWS:]
+
+        # 以 zip 一次轉置為欄式資料
+        codes, categories, names, specs = map(list, zip(*rows))
+        self._set_columns(codes, categories, names, specs, [""] * len(codes))
+        self._mark_dirty()
+        # 重建索引：排序索引於背景逐筆建立，完成前以子字串搜尋代替
+        self._init_index()
+        self._perform_search()  # 舊的搜尋結果索引已不適用
+        # 更新 UI（使用獨立命名的元件）
+        self.db_count_text.value = f"目前資料庫：{len(self.codes)} 筆紀錄"
+        if truncated:
+            self._show_snack(f"超過上限，僅匯入前 {MAX_IMPORT_ROWS} 筆資料，索引建立中…", False)
+        else:
+            self._show_snack(f"成功匯入 {len(codes)} 筆資料，索引建立中…", True)
+        self.page.update()
+
+        self.page.run_thread(self._build_index_in_background, self._index_generation,
+                             self.search_blobs)
 
     def _clear_data(self, e):
         """清除所有資料"""
-        self.all_data = DEFAULT_DATA.copy()
-        self._save_data()
+        self._set_rows(DEFAULT_DATA)
+        self._mark_dirty()
+        self._init_index()
         self._build_search_index()  # 重建索引
-        self.db_count_text.value = f"目前資料庫：{len(self.all_data)} 筆紀錄"
+        self._perform_search()  # 舊的搜尋結果索引已不適用
+        self.db_count_text.value = f"目前資料庫：{len(self.codes)} 筆紀錄"
         self._show_snack("資料已重置", True)
         self.page.update()
 
     def _show_snack(self, msg: str, is_success: bool):
-        """顯示提示訊息"""
+        """顯示提示訊息（僅變更狀態，由呼叫端負責 page.update）"""
         self.page.snack_bar = ft.SnackBar(
             content=ft.Text(msg),
             bgcolor=COLOR_PRIMARY if is_success else "red"
         )
         self.page.snack_bar.open = True
-        self.page.update()
 
 
 # -----------------------------------------------------------------------------
@@ -645,4 +1072,7 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
-    ft.app(target=main, view=ft.AppView.WEB_BROWSER)
+    # 網頁模式以 FLET_SECRET_KEY 簽署上傳網址，未設定時 get_upload_url 一律失敗；
+    # 未由環境提供時產生本行程專用的隨機金鑰
+    os.environ.setdefault("FLET_SECRET_KEY", secrets.token_urlsafe(32))
+    ft.app(target=main, view=ft.AppView.WEB_BROWSER, upload_dir=UPLOAD_DIR)